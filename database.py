@@ -1,20 +1,55 @@
 # database.py - Database configuration
-from sqlmodel import SQLModel, create_engine, Session
-from typing import Generator
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from typing import AsyncGenerator
+import os
 
-# SQLite database URL
-DATABASE_URL = "sqlite:///./test.db"
+# SQLite database URL (aiosqlite driver so queries don't block the event loop)
+DATABASE_URL = "sqlite+aiosqlite:///./test.db"
 
 # Create engine
-engine = create_engine(DATABASE_URL, echo=True)
-print("------", engine, "------")
-def create_db_and_tables():
+engine = create_async_engine(
+    DATABASE_URL,
+    # Statement logging is opt-in; echoing every query is costly in the hot path
+    echo=os.getenv("SQL_ECHO", "").lower() in ("1", "true", "yes"),
+    # A real pool so WAL's concurrent readers each get their own connection
+    poolclass=AsyncAdaptedQueuePool,
+    pool_size=16,
+    max_overflow=32,
+    connect_args={"check_same_thread": False}
+)
+
+# Session factory; objects stay usable after commit without a reload
+AsyncSessionMaker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+# Pragmas applied to every new SQLite connection; WAL lets readers run
+# alongside a writer instead of blocking on it
+SQLITE_PRAGMAS = (
+    "journal_mode=WAL",
+    "synchronous=NORMAL",
+    "busy_timeout=5000",
+    "cache_size=-64000",
+    "temp_store=MEMORY",
+    "foreign_keys=ON",
+)
+
+@event.listens_for(engine.sync_engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for pragma in SQLITE_PRAGMAS:
+        cursor.execute(f"PRAGMA {pragma}")
+    cursor.close()
+
+async def create_db_and_tables():
     from models import User, Post
     """Create all database tables"""
-    SQLModel.metadata.create_all(engine)
-    print("------------------------------------")
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
 
-def get_session() -> Generator[Session, None, None]:
+async def get_session() -> AsyncGenerator[AsyncSession, None]:
     """Dependency to get database session"""
-    with Session(engine) as session:
+    async with AsyncSessionMaker() as session:
         yield session
\ No newline at end of file
@@ -0,0 +1,13 @@
+# loaders.py - DataLoaders for batching related lookups
+from sqlmodel import select
+from sqlalchemy import Row
+from typing import List, Optional
+from sqlmodel.ext.asyncio.session import AsyncSession
+from models import User
+
+async def load_users_by_ids(session: AsyncSession, ids: List[int]) -> List[Optional[Row]]:
+    """Fetch all requested users in one IN query, in the order of ids"""
+    statement = select(User.id, User.name, User.email, User.age, User.created_at).where(User.id.in_(ids))
+    users = (await session.exec(statement)).all()
+    users_by_id = {user.id: user for user in users}
+    return [users_by_id.get(user_id) for user_id in ids]
@@ -1,29 +1,59 @@
 # main.py - FastAPI application
-from fastapi import FastAPI
+from fastapi import FastAPI, Depends
 import strawberry
+from strawberry.extensions import ParserCache, ValidationCache
 from strawberry.fastapi import GraphQLRouter
-from database import create_db_and_tables
+from strawberry.types import Info
+from aiodataloader import DataLoader
+from sqlalchemy import Row, func, insert, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import raiseload
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from database import create_db_and_tables, get_session
+from loaders import load_users_by_ids
+from models import User, Post
 import asyncio
-from typing import List, Optional
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Union
 from contextlib import asynccontextmanager
+from dataclasses import dataclass
 
 
 # Define types directly in main.py to avoid import issues
+# UserType is built for every row and author, so it uses slots instead of a
+# per-instance __dict__
 @strawberry.type
+@dataclass(slots=True, kw_only=True)
 class UserType:
     id: int
     name: str
     email: str
     age: Optional[int] = None
-    created_at: str
+    created_at: datetime
 
 @strawberry.type
 class PostType:
     id: int
     title: str
     content: str
-    created_at: str
-    author: UserType
+    created_at: datetime
+    author_id: strawberry.Private[int]
+
+    @strawberry.field
+    async def author(self, info: Info) -> UserType:
+        # Batched with every other author requested in the same tick
+        return await info.context["user_loader"].load(self.author_id)
+
+@strawberry.type
+class UserConnection:
+    nodes: List[UserType]
+    end_cursor: Optional[int] = None
+
+@strawberry.type
+class PostConnection:
+    nodes: List[PostType]
+    end_cursor: Optional[int] = None
 
 @strawberry.input
 class UserInput:
@@ -37,6 +67,63 @@ class PostInput:
     content: str
     author_id: int
 
+def _to_user_type(user: Union[User, Row]) -> UserType:
+    """Convert a User (or a row of its columns) to its GraphQL type"""
+    return UserType(
+        id=user.id,
+        name=user.name,
+        email=user.email,
+        age=user.age,
+        created_at=user.created_at
+    )
+
+def _to_post_type(post: Union[Post, Row]) -> PostType:
+    """Convert a Post (or a row of its columns) to its GraphQL type"""
+    return PostType(
+        id=post.id,
+        title=post.title,
+        content=post.content,
+        created_at=post.created_at,
+        author_id=post.author_id
+    )
+
+# Largest page users/posts will return; SQLite treats a negative LIMIT as none
+MAX_PAGE_SIZE = 100
+
+def _check_page_size(first: int) -> None:
+    """Reject page sizes outside 1..MAX_PAGE_SIZE"""
+    if not 1 <= first <= MAX_PAGE_SIZE:
+        raise Exception(f"first must be between 1 and {MAX_PAGE_SIZE}")
+
+async def get_context(session: AsyncSession = Depends(get_session)) -> dict:
+    """Build the per-request GraphQL context around a single database session"""
+    # AsyncSession can't run statements concurrently, but sibling fields resolve
+    # concurrently, so every use of the shared session takes this lock
+    session_lock = asyncio.Lock()
+
+    async def load_user_types(ids: List[int]) -> List[Optional[UserType]]:
+        """Batch-load users, building each UserType once per request"""
+        async with session_lock:
+            users = await load_users_by_ids(session, ids)
+        return [_to_user_type(user) if user else None for user in users]
+
+    return {
+        "session": session,
+        "session_lock": session_lock,
+        "user_loader": DataLoader(batch_load_fn=load_user_types)
+    }
+
+@asynccontextmanager
+async def _request_session(info: Info) -> AsyncIterator[AsyncSession]:
+    """Borrow the request's session, rolling it back if the resolver fails"""
+    async with info.context["session_lock"]:
+        session = info.context["session"]
+        try:
+            yield session
+        except Exception:
+            await session.rollback()
+            raise
+
 # Query class with all fields defined directly
 @strawberry.type
 class Query:
@@ -45,267 +132,142 @@ class Query:
         return "Hello, GraphQL with FastAPI!"
     
     @strawberry.field
-    def users(self, limit: Optional[int] = 10, offset: Optional[int] = 0) -> List[UserType]:
-        from database import engine
-        from sqlmodel import Session, select
-        from models import User
-        
-        with Session(engine) as session:
-            statement = select(User).offset(offset).limit(limit)
-            users = session.exec(statement).all()
-            print("statement->", statement)
-            print("users->", users)
-            return [
-                UserType(
-                    id=user.id,
-                    name=user.name,
-                    email=user.email,
-                    age=user.age,
-                    created_at=user.created_at.isoformat()
-                )
-                for user in users
-            ]
+    async def users(self, info: Info, first: int = 10, after: Optional[int] = None) -> UserConnection:
+        _check_page_size(first)
+        async with _request_session(info) as session:
+            # Keyset pagination: seek past the cursor on the primary key
+            # Plain column rows skip identity-map and attribute instrumentation
+            statement = select(User.id, User.name, User.email, User.age, User.created_at).order_by(User.id).limit(first)
+            if after is not None:
+                statement = statement.where(User.id > after)
+            rows = (await session.exec(statement)).all()
+            nodes = [_to_user_type(row) for row in rows]
+            return UserConnection(nodes=nodes, end_cursor=nodes[-1].id if nodes else None)
     
     @strawberry.field
-    def user(self, id: int) -> Optional[UserType]:
-        from database import engine
-        from sqlmodel import Session, select
-        from models import User
-        
-        with Session(engine) as session:
-            user = session.get(User, id)
+    async def user(self, info: Info, id: int) -> Optional[UserType]:
+        async with _request_session(info) as session:
+            user = await session.get(User, id, options=[raiseload("*")])
             if user:
-                return UserType(
-                    id=user.id,
-                    name=user.name,
-                    email=user.email,
-                    age=user.age,
-                    created_at=user.created_at.isoformat()
-                )
+                return _to_user_type(user)
             return None
     
     @strawberry.field
-    def posts(self, limit: Optional[int] = 10, offset: Optional[int] = 0) -> List[PostType]:
-        from database import engine
-        from sqlmodel import Session, select
-        from models import Post, User
-        
-        with Session(engine) as session:
-            statement = select(Post).offset(offset).limit(limit)
-            posts = session.exec(statement).all()
-            
-            result = []
-            for post in posts:
-                # Ensure we have the author relationship loaded
-                post_with_author = session.get(Post, post.id)
-                result.append(
-                    PostType(
-                        id=post_with_author.id,
-                        title=post_with_author.title,
-                        content=post_with_author.content,
-                        created_at=post_with_author.created_at.isoformat(),
-                        author=UserType(
-                            id=post_with_author.author.id,
-                            name=post_with_author.author.name,
-                            email=post_with_author.author.email,
-                            age=post_with_author.author.age,
-                            created_at=post_with_author.author.created_at.isoformat()
-                        )
-                    )
-                )
-            return result
+    async def posts(self, info: Info, first: int = 10, after: Optional[int] = None) -> PostConnection:
+        _check_page_size(first)
+        async with _request_session(info) as session:
+            # Column rows only; authors are batched through the user loader
+            statement = select(Post.id, Post.title, Post.content, Post.created_at, Post.author_id).order_by(Post.id).limit(first)
+            if after is not None:
+                statement = statement.where(Post.id > after)
+            rows = (await session.exec(statement)).all()
+            nodes = [_to_post_type(row) for row in rows]
+            return PostConnection(nodes=nodes, end_cursor=nodes[-1].id if nodes else None)
         
     @strawberry.field
-    def post(self, id: int) -> Optional[PostType]:
-        from database import engine
-        from sqlmodel import Session, select
-        from models import Post
-        
-        with Session(engine) as session:
-            post = session.get(Post, id)
+    async def post(self, info: Info, id: int) -> Optional[PostType]:
+        async with _request_session(info) as session:
+            post = await session.get(Post, id, options=[raiseload("*")])
             if not post:
                 return None
 
-            post_with_author = session.get(Post, post.id)
-            return PostType(
-                id=post_with_author.id,
-                title=post_with_author.title,
-                content=post_with_author.content,
-                created_at=post_with_author.created_at.isoformat(),
-                author= UserType(
-                    id=post_with_author.author.id,
-                    name=post_with_author.author.name,
-                    email=post_with_author.author.email,
-                    age=post_with_author.author.age,
-                    created_at=post_with_author.author.created_at.isoformat()
-                )
-            )
+            return _to_post_type(post)
 
 
 # Mutation class with all fields defined directly
 @strawberry.type
 class Mutation:
     @strawberry.mutation
-    def create_user(self, user_input: UserInput) -> UserType:
-        from database import engine
-        from sqlmodel import Session, select
-        from models import User
-        
-        with Session(engine) as session:
-            # Check if user already exists
-            existing_user = session.exec(select(User).where(User.email == user_input.email)).first()
-            if existing_user:
-                raise Exception("User with this email already exists")
-            
-            user = User(
-                name=user_input.name,
-                email=user_input.email,
-                age=user_input.age
+    async def create_user(self, info: Info, user_input: UserInput) -> UserType:
+        async with _request_session(info) as session:
+            # The unique email index rejects duplicates within the insert itself
+            statement = (
+                sqlite_insert(User)
+                .values(name=user_input.name, email=user_input.email, age=user_input.age)
+                .on_conflict_do_nothing(index_elements=["email"])
+                .returning(User)
             )
-            session.add(user)
-            session.commit()
-            session.refresh(user)
+            user = (await session.exec(statement)).scalar_one_or_none()
+            if not user:
+                raise Exception("User with this email already exists")
+            await session.commit()
             
-            return UserType(
-                id=user.id,
-                name=user.name,
-                email=user.email,
-                age=user.age,
-                created_at=user.created_at.isoformat()
-            )
+            return _to_user_type(user)
     
     @strawberry.mutation
-    def update_user(self, id: int, name: Optional[str] = None, email: Optional[str] = None, age: Optional[int] = None) -> Optional[UserType]:
-        from database import engine
-        from sqlmodel import Session, select
-        from models import User
-        
-        with Session(engine) as session:
-            user = session.get(User, id)
+    async def update_user(self, info: Info, id: int, name: Optional[str] = None, email: Optional[str] = None, age: Optional[int] = None) -> Optional[UserType]:
+        async with _request_session(info) as session:
+            # One UPDATE ... RETURNING; COALESCE keeps columns whose argument is None
+            statement = update(User).where(User.id == id).values(
+                name=func.coalesce(name, User.name),
+                email=func.coalesce(email, User.email),
+                age=func.coalesce(age, User.age)
+            ).returning(User)
+            user = (await session.exec(statement)).scalar_one_or_none()
             if not user:
                 raise Exception("User not found")
+            await session.commit()
             
-            if name is not None:
-                user.name = name
-            if email is not None:
-                user.email = email
-            if age is not None:
-                user.age = age
-            
-            session.add(user)
-            session.commit()
-            session.refresh(user)
-            
-            return UserType(
-                id=user.id,
-                name=user.name,
-                email=user.email,
-                age=user.age,
-                created_at=user.created_at.isoformat()
-            )
+            user_type = _to_user_type(user)
+            info.context["user_loader"].clear(id).prime(id, user_type)
+            return user_type
     
     @strawberry.mutation
-    def delete_user(self, id: int) -> bool:
-        from database import engine
-        from sqlmodel import Session, select
-        from models import User
-        
-        with Session(engine) as session:
-            user = session.get(User, id)
+    async def delete_user(self, info: Info, id: int) -> bool:
+        async with _request_session(info) as session:
+            user = await session.get(User, id)
             if not user:
                 raise Exception("User not found")
             
-            session.delete(user)
-            session.commit()
+            await session.delete(user)
+            await session.commit()
+            info.context["user_loader"].clear(id)
             return True
     
     @strawberry.mutation
-    def create_post(self, post_input: PostInput) -> PostType:
-        from database import engine
-        from sqlmodel import Session, select
-        from models import Post, User
-        
-        with Session(engine) as session:
+    async def create_post(self, info: Info, post_input: PostInput) -> PostType:
+        async with _request_session(info) as session:
             # Check if author exists
-            author = session.get(User, post_input.author_id)
+            author = await session.get(User, post_input.author_id, options=[raiseload("*")])
             if not author:
                 raise Exception("Author not found")
+            # prime() keeps an existing entry, so drop any stale one first
+            info.context["user_loader"].clear(author.id).prime(author.id, _to_user_type(author))
             
-            post = Post(
+            # RETURNING hands back id and created_at without a follow-up SELECT
+            statement = insert(Post).values(
                 title=post_input.title,
                 content=post_input.content,
                 author_id=post_input.author_id
-            )
-            session.add(post)
-            session.commit()
-            session.refresh(post)
+            ).returning(Post)
+            post = (await session.exec(statement)).scalar_one()
+            await session.commit()
             
-            # Get the post with author relationship
-            post_with_author = session.get(Post, post.id)
-            
-            return PostType(
-                id=post_with_author.id,
-                title=post_with_author.title,
-                content=post_with_author.content,
-                created_at=post_with_author.created_at.isoformat(),
-                author=UserType(
-                    id=post_with_author.author.id,
-                    name=post_with_author.author.name,
-                    email=post_with_author.author.email,
-                    age=post_with_author.author.age,
-                    created_at=post_with_author.author.created_at.isoformat()
-                )
-            )
+            return _to_post_type(post)
         
     @strawberry.mutation
-    def update_post(self, id:int, title:Optional[str] = None, content:Optional[str] = None) -> Optional[PostType]:
-        from database import engine
-        from sqlmodel import Session, select
-        from models import Post, User
-
-        with Session(engine) as session:
-            post = session.get(Post, id)
+    async def update_post(self, info: Info, id:int, title:Optional[str] = None, content:Optional[str] = None) -> Optional[PostType]:
+        async with _request_session(info) as session:
+            statement = update(Post).where(Post.id == id).values(
+                title=func.coalesce(title, Post.title),
+                content=func.coalesce(content, Post.content)
+            ).returning(Post)
+            post = (await session.exec(statement)).scalar_one_or_none()
             if not post:
                 raise Exception("Post not found")
-            
-            if title is not None:
-                post.title = title
-            if content is not None:
-                post.content = content
-
-            session.add(post)
-            session.commit()
-            session.refresh(post)
-
-            post_with_author = session.get(Post, post.id)
+            await session.commit()
 
-            return PostType(
-                id=post_with_author.id,
-                title=post_with_author.content,
-                content=post_with_author.content,
-                created_at=post_with_author.created_at.isoformat(),
-                author=UserType(
-                    id=post_with_author.author.id,
-                    name=post_with_author.author.name,
-                    email=post_with_author.author.email,
-                    age=post_with_author.author.age,
-                    created_at=post_with_author.author.created_at.isoformat()
-                )
-            )
+            return _to_post_type(post)
         
     @strawberry.mutation
-    def delete_post(self, id: int) -> bool:
-        from database import engine
-        from sqlmodel import Session, select
-        from models import Post
-
-        with Session(engine) as session:
-            post = session.get(Post, id)
+    async def delete_post(self, info: Info, id: int) -> bool:
+        async with _request_session(info) as session:
+            post = await session.get(Post, id, options=[raiseload("*")])
             if not post:
                 raise Exception("Post not found")
             
-            session.delete(post)
-            session.commit()
+            await session.delete(post)
+            await session.commit()
             return True
         
 
@@ -321,13 +283,15 @@ class Subscription:
 schema = strawberry.Schema(
     query=Query, 
     mutation=Mutation, 
-    subscription=Subscription
+    subscription=Subscription,
+    # Skip re-parsing and re-validating documents the server has already seen
+    extensions=[ParserCache(maxsize=256), ValidationCache(maxsize=256)]
 )
 
 # Initialize database on startup
 @asynccontextmanager
 async def life_span(app: FastAPI):
-    create_db_and_tables()
+    await create_db_and_tables()
     print("Database tables created!")
     yield
 
@@ -341,7 +305,7 @@ app = FastAPI(
 )
 
 # Create GraphQL router
-graphql_router = GraphQLRouter(schema)
+graphql_router = GraphQLRouter(schema, context_getter=get_context)
 
 # Add GraphQL endpoint
 app.include_router(graphql_router, prefix="/graphql")
@@ -1,5 +1,6 @@
 # models.py - Database models
 from sqlmodel import SQLModel, Field, Relationship
+from sqlalchemy import Index
 from typing import Optional, List
 from datetime import datetime
 
@@ -14,6 +15,10 @@ class User(SQLModel, table=True):
     posts: List["Post"] = Relationship(back_populates="author")
 
 class Post(SQLModel, table=True):
+    # Serves author_id lookups and per-author listings ordered by time; no query
+    # filters on created_at alone, so it gets no index of its own
+    __table_args__ = (Index("ix_post_author_created", "author_id", "created_at"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     title: str
     content: str
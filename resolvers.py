@@ -1,11 +1,32 @@
 # resolvers.py - GraphQL resolvers
-from sqlmodel import Session, select
-from database import engine
+from sqlmodel import select
+from sqlalchemy.orm import joinedload, raiseload
+from database import AsyncSessionMaker
 from models import User, Post
 from schemas import UserType, PostType, UserInput, UserUpdateInput, PostInput
 import strawberry
 from typing import List, Optional
 
+def _to_user_type(user: User) -> UserType:
+    """Convert a User row to its GraphQL type"""
+    return UserType(
+        id=user.id,
+        name=user.name,
+        email=user.email,
+        age=user.age,
+        created_at=user.created_at
+    )
+
+def _to_post_type(post: Post) -> PostType:
+    """Convert a Post row (with its author loaded) to its GraphQL type"""
+    return PostType(
+        id=post.id,
+        title=post.title,
+        content=post.content,
+        created_at=post.created_at,
+        author=_to_user_type(post.author)
+    )
+
 class UserResolver:
     
     @strawberry.field
@@ -13,43 +34,28 @@ class UserResolver:
         return "Hello, GraphQL with FastAPI!"
     
     @strawberry.field
-    def users(self, limit: Optional[int] = 10, offset: Optional[int] = 0) -> List[UserType]:
-        with Session(engine) as session:
+    async def users(self, limit: Optional[int] = 10, offset: Optional[int] = 0) -> List[UserType]:
+        async with AsyncSessionMaker() as session:
             statement = select(User).offset(offset).limit(limit)
-            users = session.exec(statement).all()
+            users = (await session.exec(statement)).all()
             
-            return [
-                UserType(
-                    id=user.id,
-                    name=user.name,
-                    email=user.email,
-                    age=user.age,
-                    created_at=user.created_at.isoformat()
-                )
-                for user in users
-            ]
+            return [_to_user_type(user) for user in users]
     
     @strawberry.field
-    def user(self, id: int) -> Optional[UserType]:
-        with Session(engine) as session:
-            user = session.get(User, id)
+    async def user(self, id: int) -> Optional[UserType]:
+        async with AsyncSessionMaker() as session:
+            user = await session.get(User, id)
             if user:
-                return UserType(
-                    id=user.id,
-                    name=user.name,
-                    email=user.email,
-                    age=user.age,
-                    created_at=user.created_at.isoformat()
-                )
+                return _to_user_type(user)
             return None
 
 class UserMutation:
     
     @strawberry.mutation
-    def create_user(self, user_input: UserInput) -> UserType:
-        with Session(engine) as session:
+    async def create_user(self, user_input: UserInput) -> UserType:
+        async with AsyncSessionMaker() as session:
             # Check if user already exists
-            existing_user = session.exec(select(User).where(User.email == user_input.email)).first()
+            existing_user = (await session.exec(select(User).where(User.email == user_input.email))).first()
             if existing_user:
                 raise Exception("User with this email already exists")
             
@@ -59,21 +65,15 @@ class UserMutation:
                 age=user_input.age
             )
             session.add(user)
-            session.commit()
-            session.refresh(user)
+            await session.commit()
+            await session.refresh(user)
             
-            return UserType(
-                id=user.id,
-                name=user.name,
-                email=user.email,
-                age=user.age,
-                created_at=user.created_at.isoformat()
-            )
+            return _to_user_type(user)
     
     @strawberry.mutation
-    def update_user(self, id: int, user_input: UserUpdateInput) -> Optional[UserType]:
-        with Session(engine) as session:
-            user = session.get(User, id)
+    async def update_user(self, id: int, user_input: UserUpdateInput) -> Optional[UserType]:
+        async with AsyncSessionMaker() as session:
+            user = await session.get(User, id)
             if not user:
                 raise Exception("User not found")
             
@@ -85,62 +85,39 @@ class UserMutation:
                 user.age = user_input.age
             
             session.add(user)
-            session.commit()
-            session.refresh(user)
+            await session.commit()
+            await session.refresh(user)
             
-            return UserType(
-                id=user.id,
-                name=user.name,
-                email=user.email,
-                age=user.age,
-                created_at=user.created_at.isoformat()
-            )
+            return _to_user_type(user)
     
     @strawberry.mutation
-    def delete_user(self, id: int) -> bool:
-        with Session(engine) as session:
-            user = session.get(User, id)
+    async def delete_user(self, id: int) -> bool:
+        async with AsyncSessionMaker() as session:
+            user = await session.get(User, id)
             if not user:
                 raise Exception("User not found")
             
-            session.delete(user)
-            session.commit()
+            await session.delete(user)
+            await session.commit()
             return True
 
 class PostResolver:
     
     @strawberry.field
-    def posts(self, limit: Optional[int] = 10, offset: Optional[int] = 0) -> List[PostType]:
-        with Session(engine) as session:
-            statement = select(Post).offset(offset).limit(limit)
-            posts = session.exec(statement).all()
+    async def posts(self, limit: Optional[int] = 10, offset: Optional[int] = 0) -> List[PostType]:
+        async with AsyncSessionMaker() as session:
+            statement = select(Post).options(joinedload(Post.author), raiseload("*")).offset(offset).limit(limit)
+            posts = (await session.exec(statement)).all()
             
-            result = []
-            for post in posts:
-                result.append(
-                    PostType(
-                        id=post.id,
-                        title=post.title,
-                        content=post.content,
-                        created_at=post.created_at.isoformat(),
-                        author=UserType(
-                            id=post.author.id,
-                            name=post.author.name,
-                            email=post.author.email,
-                            age=post.author.age,
-                            created_at=post.author.created_at.isoformat()
-                        )
-                    )
-                )
-            return result
+            return [_to_post_type(post) for post in posts]
 
 class PostMutation:
     
     @strawberry.mutation
-    def create_post(self, post_input: PostInput) -> PostType:
-        with Session(engine) as session:
+    async def create_post(self, post_input: PostInput) -> PostType:
+        async with AsyncSessionMaker() as session:
             # Check if author exists
-            author = session.get(User, post_input.author_id)
+            author = await session.get(User, post_input.author_id)
             if not author:
                 raise Exception("Author not found")
             
@@ -150,22 +127,7 @@ class PostMutation:
                 author_id=post_input.author_id
             )
             session.add(post)
-            session.commit()
-            session.refresh(post)
-            
-            # Refresh to get author data
-            post_with_author = session.get(Post, post.id)
+            await session.commit()
+            await session.refresh(post)
             
-            return PostType(
-                id=post_with_author.id,
-                title=post_with_author.title,
-                content=post_with_author.content,
-                created_at=post_with_author.created_at.isoformat(),
-                author=UserType(
-                    id=post_with_author.author.id,
-                    name=post_with_author.author.name,
-                    email=post_with_author.author.email,
-                    age=post_with_author.author.age,
-                    created_at=post_with_author.author.created_at.isoformat()
-                )
-            )
\ No newline at end of file
+            return _to_post_type(post)
\ No newline at end of file
@@ -1,6 +1,7 @@
 # schemas.py - GraphQL schemas
 import strawberry
 from typing import List, Optional
+from datetime import datetime
 
 @strawberry.type
 class UserType:
@@ -8,14 +9,14 @@ class UserType:
     name: str
     email: str
     age: Optional[int]
-    created_at: str
+    created_at: datetime
 
 @strawberry.type
 class PostType:
     id: int
     title: str
     content: str
-    created_at: str
+    created_at: datetime
     author: UserType
 
 @strawberry.input